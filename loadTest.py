@@ -0,0 +1,503 @@
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import psutil
+import requests
+
+# Load generator for the dashboard: starts gameSales.py's server locally (or targets
+# a running one with --url) and simulates concurrent browser sessions against it.
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+dropdownIds = ['region-selection', 'platform-selection', 'publisher-selection', 'genre-selection']
+buttonIds = ['region-select-all-button', 'platform-select-all-button', 'publisher-select-all-button', 'genre-select-all-button']
+sliderId = 'year-selection'
+
+percentiles = [0.5, 0.9, 0.95, 0.99]
+
+# Browsers open at most this many connections per host, which caps a session's parallel callbacks
+connections_per_session = 6
+
+results = []
+results_lock = threading.Lock()
+
+# Actions that failed inside the harness, kept apart from results so they don't count as requests
+failed_actions = []
+
+
+def port_in_use(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex(('127.0.0.1', port)) == 0
+
+
+def launch_server(port, processes, log):
+    # Run the app with the debug reloader off so the measured process is the one serving requests
+    code = (
+        "from gameSales import app; "
+        f"app.run(debug=False, port={port}, threaded={processes == 1}, processes={processes})"
+    )
+    return subprocess.Popen([sys.executable, '-c', code], cwd=base_dir,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def read_log_tail(log, lines=20):
+    log.flush()
+    with open(log.name, errors='replace') as f:
+        return ''.join(f.readlines()[-lines:])
+
+
+def wait_for_server(base_url, timeout, server=None, log=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        # A server that exited (import error, port conflict, no fork support) will never come up
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode} before starting:\n{read_log_tail(log)}")
+        try:
+            if requests.get(base_url + '/_dash-layout', timeout=5).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    message = f"Server at {base_url} did not come up within {timeout}s"
+    if log is not None:
+        message += f":\n{read_log_tail(log)}"
+    raise RuntimeError(message)
+
+
+def parse_dependencies(dependencies):
+    callbacks = []
+    for dep in dependencies:
+        # Multi-output callbacks are encoded as "..id1.prop1...id2.prop2.."
+        if dep['output'].startswith('..'):
+            outputs = [o.split('.') for o in dep['output'][2:-2].split('...')]
+            outputs = [{'id': i, 'property': p} for i, p in outputs]
+            label = f"{outputs[0]['id']} (+{len(outputs) - 1})"
+        else:
+            i, p = dep['output'].split('.')
+            outputs = {'id': i, 'property': p}
+            label = i
+        callbacks.append({
+            'output': dep['output'],
+            'outputs': outputs,
+            'inputs': dep['inputs'],
+            'prevent_initial_call': dep['prevent_initial_call'],
+            'label': label,
+        })
+    return callbacks
+
+
+def find_components(layout, components):
+    if isinstance(layout, list):
+        for child in layout:
+            find_components(child, components)
+    elif isinstance(layout, dict) and 'props' in layout:
+        props = layout['props']
+        if 'id' in props:
+            components[props['id']] = props
+        find_components(props.get('children'), components)
+    return components
+
+
+def record(label, start, elapsed, ok):
+    with results_lock:
+        results.append({'label': label, 'start': start, 'latency_ms': elapsed * 1000, 'ok': ok})
+
+
+def record_failed_action(action, error):
+    with results_lock:
+        first = not any(f['error'] == type(error).__name__ for f in failed_actions)
+        failed_actions.append({'action': action, 'error': type(error).__name__, 'start': time.time()})
+    # Show each kind of failure once, since it may be a bug in the harness rather than the server
+    if first:
+        print(f"Action '{action}' failed:", file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+
+
+def timed_request(session, method, url, label, parse=None, **kwargs):
+    # parse turns the response into what the caller needs; content it cannot handle counts as an error
+    start = time.time()
+    t0 = time.perf_counter()
+    result = None
+    try:
+        response = session.request(method, url, timeout=60, **kwargs)
+        elapsed = time.perf_counter() - t0
+        ok = response.status_code in (200, 204)
+        if ok:
+            result = parse(response) if parse is not None else response
+    except requests.RequestException:
+        elapsed, ok = time.perf_counter() - t0, False
+    except (ValueError, KeyError, TypeError, AttributeError):
+        ok = False
+    record(label, start, elapsed, ok)
+    return result if ok else None
+
+
+def callback_response(response):
+    # 204 means the callback raised PreventUpdate and changed nothing
+    if response.status_code == 204:
+        return {}
+    body = response.json()['response']
+    if not isinstance(body, dict) or not all(isinstance(props, dict) for props in body.values()):
+        raise TypeError('unexpected callback response')
+    return body
+
+
+def fire_callback(session, base_url, callback, values, changed=None):
+    # On page load the renderer reports every input as changed, afterwards only the triggering one
+    changed_ids = [changed] if changed else [(i['id'], i['property']) for i in callback['inputs']]
+    payload = {
+        'output': callback['output'],
+        'outputs': callback['outputs'],
+        'inputs': [dict(i, value=values.get((i['id'], i['property']))) for i in callback['inputs']],
+        'changedPropIds': [f"{component_id}.{prop}" for component_id, prop in changed_ids],
+        'state': [],
+    }
+    return timed_request(session, 'POST', base_url + '/_dash-update-component',
+                         'update: ' + callback['label'], parse=callback_response, json=payload)
+
+
+def fire_dependents(session, pool, base_url, callbacks, values, changed):
+    # Like the Dash renderer, send every callback triggered by the same change at once
+    futures = [
+        pool.submit(fire_callback, session, base_url, callback, values, changed)
+        for callback in callbacks
+        if any((i['id'], i['property']) == changed for i in callback['inputs'])
+    ]
+    updates = []
+    for future in futures:
+        for component_id, props in (future.result() or {}).items():
+            for prop, value in props.items():
+                if (component_id, prop) != changed and (component_id, prop) in values:
+                    updates.append(((component_id, prop), value))
+    # Select-all buttons write a dropdown value, which in turn triggers the graph callbacks
+    for prop_id, value in updates:
+        values[prop_id] = value
+        fire_dependents(session, pool, base_url, callbacks, values, prop_id)
+
+
+def dropdown_options(props):
+    return [o['value'] if isinstance(o, dict) else o for o in props.get('options', [])]
+
+
+def session_state(response):
+    # Raises KeyError when the layout is not this dashboard's, e.g. --url pointing at another app
+    components = find_components(response.json(), {})
+    values = {(sliderId, 'value'): components[sliderId]['value']}
+    for component_id in dropdownIds:
+        values[(component_id, 'value')] = components[component_id]['value']
+    for component_id in buttonIds:
+        values[(component_id, 'n_clicks')] = 0
+    return components, values
+
+
+def load_page(session, pool, base_url, callbacks):
+    # Initial page load: index, layout and dependencies, then every non-prevented callback
+    timed_request(session, 'GET', base_url + '/', 'index')
+    state = timed_request(session, 'GET', base_url + '/_dash-layout', 'layout', parse=session_state)
+    timed_request(session, 'GET', base_url + '/_dash-dependencies', 'dependencies', parse=lambda r: r.json())
+    if state is None:
+        return None
+
+    futures = [
+        pool.submit(fire_callback, session, base_url, callback, state[1])
+        for callback in callbacks
+        if not callback['prevent_initial_call']
+    ]
+    for future in futures:
+        future.result()
+    return state
+
+
+def run_session(base_url, callbacks, deadline, think_time, rng, stop):
+    with ThreadPoolExecutor(max_workers=connections_per_session) as pool:
+        user_loop(requests.Session(), pool, base_url, callbacks, deadline, think_time, rng, stop)
+
+
+def user_loop(session, pool, base_url, callbacks, deadline, think_time, rng, stop):
+    state = None
+
+    while not stop.is_set() and time.time() < deadline:
+        if state is None:
+            try:
+                state = load_page(session, pool, base_url, callbacks)
+            except Exception as e:
+                record_failed_action('page load', e)
+            if state is None:
+                # Failed requests are already recorded; retry rather than silently dropping this user
+                stop.wait(max(think_time, 1.0))
+            continue
+        components, values = state
+
+        if stop.wait(rng.uniform(0, 2 * think_time)):
+            break
+        action = rng.choice(['slider', 'dropdown', 'button'])
+
+        try:
+            if action == 'slider':
+                year_min, year_max = components[sliderId]['min'], components[sliderId]['max']
+                low = rng.randint(year_min, year_max)
+                changed = (sliderId, 'value')
+                values[changed] = [low, rng.randint(low, year_max)]
+            elif action == 'dropdown':
+                component_id = rng.choice(dropdownIds)
+                changed = (component_id, 'value')
+                options = dropdown_options(components[component_id])
+                selected = list(values[changed] or [])
+                # Mimic a user adding or removing a single entry
+                if selected and rng.random() < 0.5:
+                    selected.remove(rng.choice(selected))
+                else:
+                    missing = [o for o in options if o not in selected]
+                    if missing:
+                        selected.append(rng.choice(missing))
+                values[changed] = selected
+            else:
+                component_id = rng.choice(buttonIds)
+                changed = (component_id, 'n_clicks')
+                values[changed] += 1
+
+            fire_dependents(session, pool, base_url, callbacks, values, changed)
+        except Exception as e:
+            # Keep the user going so the offered load stays constant, but count the failed action
+            record_failed_action(action, e)
+
+
+def process_tree_cpu_seconds(root, children):
+    # The root's children_* times include forked workers that have already exited and been reaped
+    times = root.cpu_times()
+    total = times.user + times.system + getattr(times, 'children_user', 0) + getattr(times, 'children_system', 0)
+    for child in children:
+        try:
+            times = child.cpu_times()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        total += times.user + times.system
+    return total
+
+
+def children_uss(children):
+    # USS only counts pages private to each child, so copy-on-write memory shared with the parent is not repeated
+    uss = 0
+    for child in children:
+        try:
+            uss += child.memory_full_info().uss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return uss
+
+
+def sample_resources(pid, interval, stop, samples, started):
+    try:
+        root = psutil.Process(pid)
+        last_cpu, last_time = process_tree_cpu_seconds(root, root.children(recursive=True)), time.time()
+    except psutil.NoSuchProcess:
+        print(f"Server process {pid} not found, no resource data will be collected")
+        return
+    while not stop.wait(interval):
+        try:
+            children = root.children(recursive=True)
+            cpu = process_tree_cpu_seconds(root, children)
+            rss = root.memory_info().rss
+        except psutil.NoSuchProcess:
+            return
+        now = time.time()
+        with results_lock:
+            completed = len(results)
+        samples.append({
+            'elapsed_s': round(now - started, 1),
+            'cpu_percent': round(max(cpu - last_cpu, 0) / (now - last_time) * 100, 1),
+            'rss_mb': round(rss / 2**20, 1),
+            'children_uss_mb': round(children_uss(children) / 2**20, 1),
+            'children': len(children),
+            'requests': completed,
+        })
+        last_cpu, last_time = cpu, now
+
+
+def summarize(df_results, samples, duration):
+    summary = {}
+    total = len(df_results)
+    errors = int((~df_results['ok']).sum()) if total else 0
+    summary['requests'] = total
+    summary['errors'] = errors
+    summary['error_rate'] = errors / total if total else 0.0
+    summary['throughput_rps'] = total / duration
+
+    def latency_stats(group):
+        # Refused connections and 5xx replies return almost instantly, so they would pull latency down under overload
+        latency_ms = group.loc[group['ok'], 'latency_ms']
+        stats = {
+            'count': len(group),
+            'errors': int((~group['ok']).sum()),
+            'mean_ms': latency_ms.mean(),
+            'max_ms': latency_ms.max(),
+        }
+        for p in percentiles:
+            stats[f"p{int(p * 100)}_ms"] = latency_ms.quantile(p)
+        return pd.Series(stats)
+
+    latency = df_results.groupby('label').apply(latency_stats)
+    latency.loc['all'] = latency_stats(df_results)
+    latency = latency.round(1)
+    latency[['count', 'errors']] = latency[['count', 'errors']].astype(int)
+    summary['latency'] = latency
+
+    timeline = pd.DataFrame(samples)
+    if not timeline.empty:
+        timeline['rps'] = (timeline['requests'].diff().fillna(timeline['requests']) /
+                           timeline['elapsed_s'].diff().fillna(timeline['elapsed_s'])).round(1)
+    summary['timeline'] = timeline
+
+    summary['failed_actions'] = len(failed_actions)
+    if failed_actions:
+        summary['failed_action_types'] = pd.DataFrame(failed_actions).groupby(['action', 'error']).size()
+    return summary
+
+
+def print_report(summary, args):
+    if args.url:
+        print(f"\nTarget: {args.url}   Sessions: {args.sessions}   Duration: {args.duration}s")
+    else:
+        print(f"\nSessions: {args.sessions}   Duration: {args.duration}s   Server processes: {args.processes}")
+    print(f"Requests: {summary['requests']}   Throughput: {summary['throughput_rps']:.1f} req/s   "
+          f"Errors: {summary['errors']} ({summary['error_rate']:.2%})")
+    if summary['failed_actions']:
+        print(f"Failed actions (not counted as requests): {summary['failed_actions']}")
+        print(summary['failed_action_types'].to_string())
+    print("\nLatency (ms) per request type:")
+    print(summary['latency'].to_string())
+    if not summary['timeline'].empty:
+        print("\nServer resources over time:")
+        print(summary['timeline'][['elapsed_s', 'rps', 'cpu_percent', 'rss_mb', 'children_uss_mb', 'children']]
+              .to_string(index=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test for the video game sales dashboard')
+    parser.add_argument('--sessions', type=int, default=10, help='number of simulated concurrent users')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to keep generating load')
+    parser.add_argument('--think-time', type=float, default=0.5, help='mean pause in seconds between user actions')
+    parser.add_argument('--port', type=int, default=8050, help='port for the locally launched server')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='1 runs the dev server threaded, above 1 it forks a process per request up to this '
+                             'many at once; an approximation of multiple workers, not a pre-forked pool (POSIX only)')
+    parser.add_argument('--url', help='target an already running server instead of launching one')
+    parser.add_argument('--pid', type=int, help='server process to monitor when using --url')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='seconds between CPU/memory samples')
+    parser.add_argument('--startup-timeout', type=float, default=120, help='seconds to wait for the server to start')
+    parser.add_argument('--server-log', help='keep the locally launched server\'s output in this file')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible user behaviour')
+    parser.add_argument('--output', help='write the summary and raw samples as JSON to this file')
+    args = parser.parse_args()
+
+    if args.processes < 1:
+        parser.error('--processes must be at least 1')
+    if args.processes > 1 and os.name == 'nt' and not args.url:
+        parser.error('--processes above 1 needs fork, which the Werkzeug dev server does not support on Windows')
+
+    server, log = None, None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        pid = args.pid
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        # Otherwise whatever already listens on the port would answer and be load tested instead
+        if port_in_use(args.port):
+            sys.exit(f"Port {args.port} is already in use, pick another one with --port")
+        if args.server_log:
+            log = open(args.server_log, 'w+')
+        else:
+            log = tempfile.NamedTemporaryFile('w+', prefix='loadTest-server-', suffix='.log', delete=False)
+        server = launch_server(args.port, args.processes, log)
+        pid = server.pid
+
+    # Shared by the sessions and the resource sampler so an interrupted run stops them promptly
+    stop = threading.Event()
+    sessions = []
+    try:
+        try:
+            wait_for_server(base_url, args.startup_timeout, server, log)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        try:
+            callbacks = parse_dependencies(requests.get(base_url + '/_dash-dependencies', timeout=30).json())
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            sys.exit(f"Could not read the callback dependencies from {base_url}: {e!r}")
+
+        samples = []
+        started = time.time()
+        deadline = started + args.duration
+        sampler = None
+        if pid is not None:
+            sampler = threading.Thread(target=sample_resources,
+                                       args=(pid, args.sample_interval, stop, samples, started), daemon=True)
+            sampler.start()
+
+        rng = random.Random(args.seed)
+        sessions = [
+            threading.Thread(target=run_session,
+                             args=(base_url, callbacks, deadline, args.think_time, random.Random(rng.random()), stop))
+            for _ in range(args.sessions)
+        ]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+
+        stop.set()
+        if sampler is not None:
+            sampler.join()
+        duration = time.time() - started
+    finally:
+        stop.set()
+        if server is not None:
+            server.terminate()
+            server.wait()
+            log.close()
+            if not args.server_log:
+                os.remove(log.name)
+        for session in sessions:
+            session.join()
+
+    if not results:
+        print("No requests completed")
+        return
+
+    summary = summarize(pd.DataFrame(results), samples, duration)
+    print_report(summary, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'target': args.url or base_url,
+                'sessions': args.sessions,
+                'duration_s': duration,
+                'processes': None if args.url else args.processes,
+                'requests': summary['requests'],
+                'errors': summary['errors'],
+                'error_rate': summary['error_rate'],
+                'throughput_rps': summary['throughput_rps'],
+                'failed_actions': summary['failed_actions'],
+                # Request types where every request failed have no latency, written as null
+                'latency_ms': summary['latency'].astype(object).where(summary['latency'].notna(), None)
+                .to_dict(orient='index'),
+                'timeline': summary['timeline'].to_dict(orient='records'),
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit("Interrupted")